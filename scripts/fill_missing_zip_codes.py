@@ -1,213 +1,175 @@
+import numpy as np
 import pandas as pd
-import re
-from typing import List, Optional, Any, TypedDict
-from helpers import ProposedChange
+from typing import Optional, Any, Tuple, TypedDict
+from helpers import ProposalBatch, ZIP_RE, add_norm_columns
+
+# per-row ZIP status codes (int8 `_status` column)
+ZIP_BLANK, ZIP_VALID, ZIP_INVALID = 0, 1, 2
+
+# Rules 1, 3a, 3b share one scan
+def propose_zip_rules(
+    df_merged_view: pd.DataFrame,
+    by_eid: bool = True,
+    by_address: bool = True,
+) -> Tuple[ProposalBatch, ProposalBatch, ProposalBatch]:
+    """
+    Rules 1, 3a and 3b in a single pass over the merged view. The normalised
+    keys and the per-row ZIP status are computed once, and the
+    (EID_1, num1_c, street_norm) canonical ZIPs are shared by Rules 1 and 3a.
 
-ZIP_RE = re.compile(r'^_\d{5}$')
+    Rule 1:  Within each (EID_1, num1_c, street_norm) group, if exactly one
+             valid ZIP exists, fill every blank ZIP in that group with that ZIP.
+    Rule 3a: Same groups; replace every invalid non-blank ZIP with that ZIP.
+    Rule 3b: For every (state, city, street_norm, num1_c) group —regardless
+             of EID—if *exactly one* valid ZIP appears among non-blank rows, fill
+             all blank ZIPs in that combo with that official ZIP.
 
-# Rule 1
-def propose_fill_missing_zips_keep(df_merged_view: pd.DataFrame) -> List[ProposedChange]:
-    """
-    Rule 1: Within each (EID_1, num1_c, street_norm) group, if exactly one f
-    valid ZIP exists, fill every blank ZIP in that group with that ZIP.
+    by_eid=False skips Rules 1 and 3a, by_address=False skips Rule 3b; a
+    skipped rule comes back as an empty batch and its columns are not needed.
 
-    Returns a list[ProposedChange]
+    Returns (rule1, rule3a, rule3b), each a ProposalBatch
     """
-    need = ["AID", "EID_1", "num1_c", "streetName_c", "zip_c"]
+    need = ["AID", "num1_c", "streetName_c", "zip_c"]
+    keys = ["street_norm"]
+    if by_eid:
+        need += ["EID_1"]
+    if by_address:
+        need += ["state_c", "city_c"]
+        keys += ["state_norm", "city_norm"]
     if missing := [c for c in need if c not in df_merged_view.columns]:
-        raise ValueError(f"Missing cols for Rule 1: {missing}")
+        raise ValueError(f"Missing cols for ZIP rules: {missing}")
 
-    df = df_merged_view.loc[:, need].copy()
+    # normalised keys are usually precomputed on the shared view by main
+    df = df_merged_view.loc[:, need + [k for k in keys if k in df_merged_view.columns]].copy()
+    add_norm_columns(df, keys)
 
-    # make them all lowercases because case changes are not as interesting to use and strip of whitespace
-    df["street_norm"] = (
-        df["streetName_c"]
-          .fillna("")
-          .astype("string")
-          .str.strip()
-          .str.lower()
-    )
+    # categorical so the groupby/merge below work on int codes
+    for c in keys:
+        df[c] = df[c].astype("category")
 
     z = df["zip_c"].fillna("").astype(str).str.strip()
-    df["_valid"] = z.str.match(r"^_\d{5}$")
-    df["_blank"] = z.eq("")
-
+    # one int8 status per row instead of three bool columns
+    df["_status"] = np.select(
+        [z.str.match(ZIP_RE).to_numpy(dtype=bool), z.eq("").to_numpy(dtype=bool)],
+        [ZIP_VALID, ZIP_BLANK],
+        ZIP_INVALID,
+    ).astype(np.int8)
+    is_valid = df["_status"].eq(ZIP_VALID)
+
+    rule1 = rule3a = rule3b = ProposalBatch.concat([])
+    if by_eid:
+        rule1, rule3a = _propose_by_eid(df, is_valid)
+    if by_address:
+        rule3b = _propose_by_address(df, is_valid)
+    return rule1, rule3a, rule3b
+
+
+def _propose_by_eid(df: pd.DataFrame, is_valid: pd.Series) -> Tuple[ProposalBatch, ProposalBatch]:
+    # Rules 1 + 3a: for each (EID, house-number, street) group,
+    # see if all rows share the SAME valid ZIP.
+    # If so, treat that ZIP as the “official” one.
     grp = ["EID_1", "num1_c", "street_norm"]
 
-    # For each (EID, house-number, street) group,
-    #         see if all rows share the SAME valid ZIP.
-    #         If so, treat that ZIP as the “official” one.
-
     canon = (
-        df.loc[df["_valid"], grp + ["zip_c"]]
+        df.loc[is_valid, grp + ["zip_c"]]
           .drop_duplicates()
-          .groupby(grp, sort=False)["zip_c"]
+          .groupby(grp, sort=False, observed=True)["zip_c"]
           .agg(list)
           .reset_index(name="zip_lst")
     )
-    canon = canon[canon["zip_lst"].str.len().eq(1)]
+    canon = canon[canon["zip_lst"].str.len().eq(1)]         # unique ZIP only
     canon["canon_zip"] = canon["zip_lst"].str[0]
     canon = canon.drop(columns="zip_lst")
 
-    # Merge (“join”) the official ZIP back onto the full table,
-    # then keep only the rows where the ZIP is still blank—
-    # those are the ones we need to fill.
-
-    df = df.merge(canon, on=grp, how="left")
-    targets = df.loc[df["_blank"] & df["canon_zip"].notna(),
-                     ["AID", "EID_1", "zip_c", "canon_zip"]]
-
-    #Creating proposal list
-    proposals: List[ProposedChange] = [
-        {
-            "original_AID": int(aid),
-            "EID_context": str(eid),
-            "column_to_change": "zip_c",
-            "original_value": orig,          # "" or NaN
-            "proposed_value": new,           # canonical underscore-prefixed ZIP
-            "rule_name": "Rule 1: Fill Missing ZIPs (Keep)",
-        }
-        for aid, eid, orig, new in targets.itertuples(index=False, name=None)
-    ]
-    return proposals
-
-#Fast vectorised version of Rule 3a
-def propose_replace_invalid_zips(df_merged_view: pd.DataFrame) -> List[ProposedChange]:
-    """
-    Rule 3a (fast): For each (EID_1, num1_c, street_norm) group, if exactly one
-    valid ZIP appears, replace every invalid non-blank ZIP in that trio with
-    that official ZIP.
+    # Merge (“join”) the official ZIP back onto the full table once,
+    # then keep the blank (Rule 1) and invalid (Rule 3a) rows to fix.
+    by_eid = df.merge(canon, on=grp, how="left")
+    has_canon = by_eid["canon_zip"].notna()
+    t1  = by_eid.loc[by_eid["_status"].eq(ZIP_BLANK) & has_canon]
+    t3a = by_eid.loc[by_eid["_status"].eq(ZIP_INVALID) & has_canon]
+
+    rule1 = ProposalBatch.build(
+        aid=t1["AID"], eid=t1["EID_1"].astype(str), col="zip_c",
+        orig=t1["zip_c"],                # "" or NaN
+        new=t1["canon_zip"],             # canonical underscore-prefixed ZIP
+        rule="Rule 1: Fill Missing ZIPs (Keep)",
+    )
+    rule3a = ProposalBatch.build(
+        aid=t3a["AID"], eid=t3a["EID_1"].astype(str), col="zip_c",
+        orig=t3a["zip_c"], new=t3a["canon_zip"],
+        rule="Rule 3a: Replace Invalid ZIPs",
+    )
+    return rule1, rule3a
 
-    Returns a list[ProposedChange]
-    """
-    need = ["AID", "EID_1", "num1_c", "streetName_c", "zip_c"]
-    if missing := [c for c in need if c not in df_merged_view.columns]:
-        raise ValueError(f"Missing cols for Rule 3a: {missing}")
 
-    df = df_merged_view.loc[:, need].copy()
+def _propose_by_address(df: pd.DataFrame, is_valid: pd.Series) -> ProposalBatch:
+    # Rule 3b: same idea per (state, city, street, house-number), any EID
+    grp = ["state_norm", "city_norm", "street_norm", "num1_c"]
+
+    valid = df.loc[is_valid, grp + ["zip_c"]]
 
-    # make them all lowercases because case changes are not as interesting to use and strip of whitespace
-    df["street_norm"] = (
-        df["streetName_c"]
-          .fillna("")
-          .astype("string")
-          .str.strip()
-          .str.lower()
+    n_zip = valid.groupby(grp, sort=False, observed=True)["zip_c"].transform("nunique")
+    # keep combos where exactly one unique ZIP
+    canon = (
+        valid.loc[n_zip.eq(1)]
+             .drop_duplicates(subset=grp)
+             .rename(columns={"zip_c": "canon_zip"})
     )
-    z = df["zip_c"].fillna("").astype(str).str.strip()
-    df["_valid"]   = z.str.match(r"^_\d{5}$")
-    df["_blank"]   = z.eq("")
-    df["_invalid"] = (~df["_valid"]) & (~df["_blank"])
 
-    grp = ["EID_1", "num1_c", "street_norm"]
+    by_addr = df.merge(canon, on=grp, how="left", copy=False)
+    targets = by_addr.loc[by_addr["_status"].eq(ZIP_BLANK) & by_addr["canon_zip"].notna(),
+                          ["AID", "zip_c", "canon_zip"]]
 
-    # For each (EID, house-number, street) group,
-    # see if all rows share the SAME valid ZIP.
-    # If so, treat that ZIP as the “official” one.
-
-    canon = (
-        df.loc[df["_valid"], grp + ["zip_c"]]
-          .drop_duplicates()
-          .groupby(grp, sort=False)["zip_c"]
-          .agg(list)
-          .reset_index(name="zip_lst")
+    return ProposalBatch.build(
+        aid=targets["AID"], eid=None, col="zip_c",
+        orig=targets["zip_c"],           # "" or NaN
+        new=targets["canon_zip"],
+        rule="Rule 3b: Fill Missing ZIPs by Address",
     )
-    canon = canon[canon["zip_lst"].str.len().eq(1)]         # unique ZIP only
-    canon["canon_zip"] = canon["zip_lst"].str[0]
-    canon = canon.drop(columns="zip_lst")
 
-    # Merge (“join”) the official ZIP back onto the full table,
-    # then keep only the rows where the ZIP is still blank—
-    # those are the ones we need to fill.
-
-    df = df.merge(canon, on=grp, how="left")
-    targets = df.loc[df["_invalid"] & df["canon_zip"].notna(),
-                     ["AID", "EID_1", "zip_c", "canon_zip"]]
-
-    #Creating proposal list
-    proposals: List[ProposedChange] = [
-        {
-            "original_AID": int(aid),
-            "EID_context": str(eid),
-            "column_to_change": "zip_c",
-            "original_value": orig,
-            "proposed_value": new,
-            "rule_name": "Rule 3a: Replace Invalid ZIPs",
-        }
-        for aid, eid, orig, new in targets.itertuples(index=False, name=None)
-    ]
-    return proposals
+
+# Rule 1
+def propose_fill_missing_zips_keep(df_merged_view: pd.DataFrame) -> ProposalBatch:
+    """
+    Rule 1: Within each (EID_1, num1_c, street_norm) group, if exactly one
+    valid ZIP exists, fill every blank ZIP in that group with that ZIP.
+
+    Returns a ProposalBatch. Prefer propose_zip_rules when running
+    Rules 1, 3a and 3b together.
+    """
+    need = ["AID", "EID_1", "num1_c", "streetName_c", "zip_c"]
+    if missing := [c for c in need if c not in df_merged_view.columns]:
+        raise ValueError(f"Missing cols for Rule 1: {missing}")
+    return propose_zip_rules(df_merged_view, by_address=False)[0]
+
+
+# Rule 3a
+def propose_replace_invalid_zips(df_merged_view: pd.DataFrame) -> ProposalBatch:
+    """
+    Rule 3a: For each (EID_1, num1_c, street_norm) group, if exactly one
+    valid ZIP appears, replace every invalid non-blank ZIP in that trio with
+    that official ZIP.
+
+    Returns a ProposalBatch
+    """
+    need = ["AID", "EID_1", "num1_c", "streetName_c", "zip_c"]
+    if missing := [c for c in need if c not in df_merged_view.columns]:
+        raise ValueError(f"Missing cols for Rule 3a: {missing}")
+    return propose_zip_rules(df_merged_view, by_address=False)[1]
 
 
 #3b
 def propose_fill_missing_zips_by_address(
     df_view: pd.DataFrame
-) -> List[ProposedChange]:
+) -> ProposalBatch:
     """
-    Rule 3b (fast): For every (state, city, street_norm, num1_c) group —regardless
+    Rule 3b: For every (state, city, street_norm, num1_c) group —regardless
     of EID—if *exactly one* valid ZIP appears among non-blank rows, fill all blank
     ZIPs in that combo with that official ZIP.
 
-    Returns list[ProposedChange]
+    Returns a ProposalBatch
     """
     need = ["AID", "state_c", "city_c", "streetName_c", "num1_c", "zip_c"]
-    if miss := [c for c in need if c not in df_view.columns]:
-        raise ValueError(f"Missing cols for 3b: {miss}")
-
-    df = (
-        df_view.loc[:, need]        # keep only needed cols
-              .copy()
-    )
-
-    # make them all lowercases because case changes are not as interesting to use and strip of whitespace
-    df["state_norm"]  = df["state_c"].fillna("").str.strip().str.upper()
-    df["city_norm"]   = df["city_c"].fillna("").str.strip().str.lower()
-    df["street_norm"] = df["streetName_c"].fillna("").str.strip().str.lower()
-
-    z = df["zip_c"].fillna("").astype(str).str.strip()
-    df["_valid"] = z.str.match(r"^_\d{5}$")
-    df["_blank"] = z.eq("")
-
-    grp = ["state_norm", "city_norm", "street_norm", "num1_c"]
-
-    # For each (EID, house-number, street) group,
-    # see if all rows share the SAME valid ZIP.
-    # If so, treat that ZIP as the “official” one.
-
-    valid = df.loc[df["_valid"], grp + ["zip_c"]]
-
-    nunique = (
-        valid.groupby(grp, sort=False)["zip_c"]
-             .nunique()
-             .rename("n_zip")
-    )
-    # keep combos where exactly one unique ZIP
-    canon = (
-        valid.merge(nunique.reset_index(), on=grp)
-             .loc[lambda d: d["n_zip"].eq(1)]
-             .drop_duplicates(subset=grp)
-             .rename(columns={"zip_c": "canon_zip"})
-             .drop(columns="n_zip")
-    )
-
-    # Merge (“join”) the official ZIP back onto the full table,
-    # then keep only the rows where the ZIP is still blank—
-    # those are the ones we need to fill.
-    df = df.merge(canon, on=grp, how="left", copy=False)
-
-    targets = df.loc[df["_blank"] & df["canon_zip"].notna(),
-                     ["AID", "zip_c", "canon_zip"]]
-
-    #Creating proposal list
-    return [
-        {
-            "original_AID": int(aid),
-            "EID_context": None,
-            "column_to_change": "zip_c",
-            "original_value": orig,      # "" or NaN
-            "proposed_value": new,
-            "rule_name": "Rule 3b: Fill Missing ZIPs by Address",
-        }
-        for aid, orig, new in targets.itertuples(index=False, name=None)
-    ]
-
+    if missing := [c for c in need if c not in df_view.columns]:
+        raise ValueError(f"Missing cols for 3b: {missing}")
+    return propose_zip_rules(df_view, by_eid=False)[2]
@@ -1,32 +1,31 @@
+import numpy as np
 import pandas as pd
 from collections import defaultdict
-from typing import List, TypedDict, Optional, Any
-from helpers import ProposedChange, UnionFind
-from rapidfuzz.distance import Levenshtein as _lev
+from typing import TypedDict, Optional, Any
+from helpers import ProposalBatch, UnionFind, add_norm_columns, similar_pairs
 
-
-#func for string distance
-def _distance(a: str, b: str) -> int:
-    return _lev.distance(a, b)
+RULE_NAME = "Rule 2: Street-name majority vote"
 
 def propose_street_name_corrections(
     df_merged_view: pd.DataFrame,
     threshold: float = 0.10,
-) -> List[ProposedChange]:
+) -> ProposalBatch:
     """
     Rule 2 – Majority-vote street-name correction inside each (EID_1, num1_c) bucket.
-    Returns a list of ProposedChange dicts; does NOT mutate the input frame.
+    Returns a ProposalBatch; does NOT mutate the input frame.
     """
-    proposals: List[ProposedChange] = []
+    empty = ProposalBatch.build([], [], "streetName_c", [], [], RULE_NAME)
 
     need = ["AID", "EID_1", "num1_c", "streetName_c"]
     if missing := [c for c in need if c not in df_merged_view.columns]:
         raise ValueError(f"Missing columns for street-name rule: {missing}")
 
     #to save some runtime, we can just use the needed columns for our rule
+    # (plus street_norm when main has already computed it)
+    keys = ["street_norm"]
     df = (
         df_merged_view
-        .loc[:, need]
+        .loc[:, need + [k for k in keys if k in df_merged_view.columns]]
         .dropna()
         .assign(
             streetName_c=lambda d: d["streetName_c"].astype("string")
@@ -34,7 +33,8 @@ def propose_street_name_corrections(
         .copy()
     )
     if df.empty:
-        return proposals
+        return empty
+    add_norm_columns(df, keys)
 
     # Pre-compute frequency of ORIGINAL spellings within each (EID,num)
     freq = (
@@ -43,13 +43,8 @@ def propose_street_name_corrections(
           .to_dict()
     )
 
-    # strip whitespace and lowercase
-    df["street_norm"] = (
-        df["streetName_c"]
-        .str.strip()
-        .str.lower()
-        .astype("string")
-    )
+    # per-cluster column chunks, concatenated into one batch at the end
+    aids, eids, origs, news = [], [], [], []
 
     for (eid, num), g in df.groupby(["EID_1", "num1_c"], observed=True):
         norms = g["street_norm"].unique().tolist()
@@ -59,17 +54,8 @@ def propose_street_name_corrections(
         norms.sort(key=len)
         uf = UnionFind(norms)
 
-        for i, s1 in enumerate(norms):
-            len1 = len(s1)
-            for s2 in norms[i + 1:]:
-                len2 = len(s2)
-                # do some filtering of the strings so we don't run the comparison needlessly
-                diff = abs(len1 - len2)
-                longer = max(len1, len2)
-                if diff and diff / longer >= threshold and diff > 2:
-                    continue
-                if _distance(s1, s2) / longer < threshold:
-                    uf.union(s1, s2)
+        for i, j in similar_pairs(norms, threshold):
+            uf.union(norms[i], norms[j])
 
         # Proposed changes per group
         for cluster_norms in uf.clusters().values():
@@ -86,14 +72,14 @@ def propose_street_name_corrections(
             if needs_fix.empty:
                 continue
 
-            for aid, cur in zip(needs_fix["AID"], needs_fix["streetName_c"]):
-                proposals.append({
-                    "original_AID": int(aid),
-                    "EID_context": str(eid),
-                    "column_to_change": "streetName_c",
-                    "original_value": cur,
-                    "proposed_value": best,
-                    "rule_name": "Rule 2: Street-name majority vote"
-                })
+            aids.append(needs_fix["AID"].to_numpy())
+            eids.append(np.full(len(needs_fix), str(eid), dtype=object))
+            origs.append(needs_fix["streetName_c"].to_numpy(dtype=object))
+            news.append(np.full(len(needs_fix), best, dtype=object))
 
-    return proposals
+    if not aids:
+        return empty
+    return ProposalBatch.build(
+        aid=np.concatenate(aids), eid=np.concatenate(eids), col="streetName_c",
+        orig=np.concatenate(origs), new=np.concatenate(news), rule=RULE_NAME,
+    )
@@ -1,6 +1,39 @@
+import re
+import numpy as np
+import pandas as pd
 from collections import defaultdict
-from typing import TypedDict, Optional, Any
+from typing import TypedDict, Optional, Any, Iterable
 from dataclasses import dataclass
+from rapidfuzz import process as _rfp
+from rapidfuzz.distance import Levenshtein as _lev
+
+# valid cleaned ZIP: underscore + 5 digits, compiled once for every rule
+ZIP_RE = re.compile(r'^_\d{5}$')
+
+# similar_pairs: group size from which cdist runs on all cores
+_PARALLEL_MIN = 256
+
+# normalised key column → (raw column, upper-case?)
+NORM_COLUMNS = {
+    "street_norm": ("streetName_c", False),
+    "city_norm":   ("city_c", False),
+    "state_norm":  ("state_c", True),
+}
+
+def add_norm_columns(df: pd.DataFrame, keys: Iterable[str] = NORM_COLUMNS) -> pd.DataFrame:
+    """
+    Add the stripped, case-folded norm `keys` (street_norm / city_norm /
+    state_norm) the rules group on, in place, and return `df`. Keys already
+    present (e.g. precomputed once by main) are left alone. Callers pass
+    their own projected copy, so only the rule's columns are touched.
+    """
+    for norm in keys:
+        if norm in df.columns:
+            continue
+        raw, upper = NORM_COLUMNS[norm]
+        s = df[raw].astype("string").fillna("").str.strip()
+        df[norm] = s.str.upper() if upper else s.str.lower()
+    return df
 
 class ProposedChange(TypedDict):
     original_AID: int
@@ -10,6 +43,63 @@ class ProposedChange(TypedDict):
     proposed_value: Any
     rule_name: str
 
+@dataclass
+class ProposalBatch:
+    """
+    Proposed changes as parallel arrays (structure of arrays): entry i of
+    every field describes one proposal, i.e. one ProposedChange.
+    """
+    aid:  np.ndarray      # original_AID (int64)
+    eid:  np.ndarray      # EID_context (object; None when not EID-scoped)
+    col:  np.ndarray      # column_to_change
+    orig: np.ndarray      # original_value
+    new:  np.ndarray      # proposed_value
+    rule: np.ndarray      # rule_name
+
+    @classmethod
+    def build(cls, aid: Iterable, eid: Optional[Iterable], col: str,
+              orig: Iterable, new: Iterable, rule: str) -> "ProposalBatch":
+        """One rule's proposals; `col` and `rule` are broadcast, eid=None means no EID context."""
+        aid = np.asarray(aid, dtype=np.int64)
+        n = len(aid)
+        return cls(
+            aid=aid,
+            eid=np.full(n, None, dtype=object) if eid is None else np.asarray(eid, dtype=object),
+            col=np.full(n, col, dtype=object),
+            orig=np.asarray(orig, dtype=object),
+            new=np.asarray(new, dtype=object),
+            rule=np.full(n, rule, dtype=object),
+        )
+
+    @classmethod
+    def concat(cls, batches: Iterable["ProposalBatch"]) -> "ProposalBatch":
+        batches = list(batches)
+        if not batches:
+            return cls.build([], None, "", [], [], "")
+        return cls(**{
+            f: np.concatenate([getattr(b, f) for b in batches])
+            for f in ("aid", "eid", "col", "orig", "new", "rule")
+        })
+
+    def __len__(self) -> int:
+        return len(self.aid)
+
+    def records(self, k: Optional[int] = None) -> list[ProposedChange]:
+        """First `k` proposals (all if None) as ProposedChange dicts, e.g. for display."""
+        return [
+            {
+                "original_AID": int(a),
+                "EID_context": e,
+                "column_to_change": c,
+                "original_value": o,
+                "proposed_value": v,
+                "rule_name": r,
+            }
+            for a, e, c, o, v, r in zip(self.aid[:k], self.eid[:k], self.col[:k],
+                                        self.orig[:k], self.new[:k], self.rule[:k])
+        ]
+
+
 @dataclass
 class SplitEvent:
     old_aid: int
@@ -25,9 +115,14 @@ class UnionFind:
         self.rank = [0] * len(elems)
 
     def _find(self, i: int) -> int:
-        if self.par[i] != i:
-            self.par[i] = self._find(self.par[i])
-        return self.par[i]
+        # iterative two-pass: locate the root, then compress the path to it
+        par  = self.par
+        root = i
+        while par[root] != root:
+            root = par[root]
+        while par[i] != root:
+            par[i], i = root, par[i]
+        return root
 
     def union(self, a: str, b: str) -> None:
         ra, rb = self._find(self.idx[a]), self._find(self.idx[b])
@@ -46,3 +141,25 @@ class UnionFind:
         for e, i in self.idx.items():
             out[self._find(i)].append(e)
         return out
+
+
+def similar_pairs(strings: list[str], threshold: float) -> np.ndarray:
+    """
+    Return every (i, j), i < j, whose Levenshtein distance divided by the
+    longer length is below `threshold`. The whole distance matrix is computed
+    in rapidfuzz's C core in one call.
+    """
+    lens   = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    longer = np.maximum.outer(lens, lens)
+    # distances past the cutoff can never pass the ratio test; let rapidfuzz stop early
+    cutoff = int(threshold * lens.max()) + 1
+    dm = _rfp.cdist(
+        strings, strings,
+        scorer=_lev.distance,
+        score_cutoff=cutoff,
+        dtype=np.int32,
+        # threads only pay off once the matrix is big; most groups are tiny
+        workers=-1 if len(strings) >= _PARALLEL_MIN else 1,
+    )
+    close = dm / np.maximum(longer, 1) < threshold
+    return np.argwhere(np.triu(close, k=1))
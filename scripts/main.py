@@ -10,41 +10,50 @@ Rule's functions can be found in the following files:
   * fill_street_name.py - Rule 2
   * fuzzy_search.py - Rule 4
   * fuzzy_search_cities.py
-  * helpers.py - classes: ProposedChange and SplitEvent
+  * helpers.py - classes: ProposedChange, ProposalBatch and SplitEvent
 """
 
 from __future__ import annotations
 
+import os
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from collections import defaultdict
-from typing import Callable, List, Tuple, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Tuple, Any
 
-from helpers import ProposedChange, SplitEvent
+from helpers import ProposalBatch, SplitEvent, add_norm_columns
 
 #Import rule functions engines
 from fuzzy_search import propose_street_name_corrections           # Rule 2
-from fill_missing_zip_codes import (
-    propose_fill_missing_zips_keep,      # Rule 1
-    propose_replace_invalid_zips,        # Rule 3a
-    propose_fill_missing_zips_by_address # Rule 3b
-)
+from fill_missing_zip_codes import propose_zip_rules                # Rule 1, 3a, 3b
 from fuzzy_search_cities import propose_correct_city_names_by_zip  # Rule 4
 from pandas import DataFrame
 
+# Arrow's multithreaded CSV reader when pyarrow is installed, else pandas' C parser
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
 #  Search thresholds for easy modulation
 STREET_THRESHOLD = 0.10
 CITY_THRESHOLD   = 0.10
 
+# Columns read by the rule engines; everything else in the merged view is dead weight
+RULE_COLUMNS = ["AID", "EID_1", "num1_c", "streetName_c", "zip_c", "city_c", "state_c"]
+
 # Path helpers
 DATA_DIR = Path(__file__).parent.parent / "data"
 
 
 def load_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
 
-    df_fa      = pd.read_csv(DATA_DIR / "fa.csv")
-    df_fe      = pd.read_csv(DATA_DIR / "fe.csv")
-    df_r_fe_fa = pd.read_csv(DATA_DIR / "r_fe_fa.csv")
+    df_fa      = pd.read_csv(DATA_DIR / "fa.csv", engine=CSV_ENGINE)
+    df_fe      = pd.read_csv(DATA_DIR / "fe.csv", engine=CSV_ENGINE)
+    df_r_fe_fa = pd.read_csv(DATA_DIR / "r_fe_fa.csv", engine=CSV_ENGINE)
 
     #ensure type consistency
     df_fa["AID"]   = df_fa["AID"].astype(int)
@@ -57,15 +66,29 @@ def load_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     )
     return df_fa, df_r_fe_fa, df_fe
 
-def reconstruct_full_address(row: pd.Series) -> str:
-    parts = [
-        str(row["num1_c"])           if pd.notna(row.get("num1_c"))           else None,
-        str(row["streetName_c"])      if pd.notna(row.get("streetName_c"))      else None,
-        str(row["city_c"])            if pd.notna(row.get("city_c"))            else None,
-        str(row["state_c"])           if pd.notna(row.get("state_c"))           else None,
-        str(row["zip_c"])             if pd.notna(row.get("zip_c"))             else None,
-    ]
-    return " ".join([p for p in parts if p]).strip()
+def reconstruct_full_address(df: pd.DataFrame) -> pd.Series:
+    """Rebuild fullAddress_c for every row of `df` in one columnar pass."""
+    cols  = ["num1_c", "streetName_c", "city_c", "state_c", "zip_c"]
+    parts = df.reindex(columns=cols).astype("string").fillna("")
+
+    # join non-empty parts with a single space (same as " ".join on a row)
+    full = parts[cols[0]]
+    for c in cols[1:]:
+        part = parts[c]
+        full = (full + " " + part).where(part.ne(""), full).where(full.ne(""), part)
+    return full.str.strip()
+
+def _composite_key(df: pd.DataFrame, cols: list[str]) -> np.ndarray:
+    """Int64 key that is equal for two rows iff they agree on every col (NaN included)."""
+    key = np.zeros(len(df), dtype=np.int64)
+    for c in cols:
+        codes, uniques = pd.factorize(df[c])      # NaN → -1
+        n = len(uniques) + 1
+        # re-densify before the mixed-radix step could overflow int64
+        if key.max(initial=0) > (np.iinfo(np.int64).max - n) // n:
+            key = pd.factorize(key)[0].astype(np.int64)
+        key = key * n + (codes + 1)
+    return key
 
 # Post‑split consistency pass
 def split_conflicting_addresses(
@@ -88,22 +111,22 @@ def split_conflicting_addresses(
     df_fa_sub = df_fa[["AID", *signature_cols]]
     df_r = df_r.merge(df_fa_sub, left_on="AID_2", right_on="AID", how="left")
 
-    # Entity‑aware signature: (EID, all address cols)
-    df_r["signature"] = (
-        df_r[["EID_1", *signature_cols]]
-        .astype(str)
-        .agg("|".join, axis=1)
-    )
+    # Entity‑aware signature: (EID, all address cols) as one int key
+    df_r["signature"] = _composite_key(df_r, ["EID_1", *signature_cols])
 
     # AIDs that map to >1 signature
-    bad_aids = (
-        df_r.groupby("AID_2")["signature"].nunique().loc[lambda s: s.gt(1)].index
+    sig_counts = (
+        df_r[["AID_2", "signature"]]
+            .drop_duplicates()
+            .groupby("AID_2")
+            .size()
     )
+    bad_aids = sig_counts.index[sig_counts.gt(1)]
     if bad_aids.empty:
         return df_fa, df_r[["EID_1", "AID_2", "relationshipType", "number"]]
 
     next_aid = df_fa["AID"].max() + 1
-    remap: dict[tuple[int, str], int] = {}
+    remap: dict[tuple[int, int], int] = {}
 
     for aid in bad_aids:
         sigs = df_r.loc[df_r["AID_2"] == aid, "signature"].unique()
@@ -111,18 +134,18 @@ def split_conflicting_addresses(
             remap[(aid, sig)] = next_aid
             next_aid += 1
 
-    df_r["AID_2"] = df_r.apply(
-        lambda r: remap.get((r["AID_2"], r["signature"]), r["AID_2"]), axis=1
-    )
+    keys   = pd.MultiIndex.from_arrays([df_r["AID_2"], df_r["signature"]])
+    mapped = pd.Series(keys.map(remap), index=df_r.index)
+    df_r["AID_2"] = mapped.where(mapped.notna(), df_r["AID_2"]).astype(int)
 
-    # Clone df_fa rows
-    additions = []
-    for (old_aid, sig), new_aid in remap.items():
-        base = df_fa.loc[df_fa["AID"] == old_aid].iloc[0].copy()
-        base["AID"] = new_aid
-        additions.append(base)
+    # Clone df_fa rows with one indexed gather (first row per AID, as before)
+    fa_indexed = df_fa.drop_duplicates(subset="AID").set_index("AID", drop=False)
+    old_aids   = np.fromiter((k[0] for k in remap), dtype=int, count=len(remap))
+    new_aids   = np.fromiter(remap.values(), dtype=int, count=len(remap))
+    additions  = fa_indexed.loc[old_aids].reset_index(drop=True)
+    additions["AID"] = new_aids
 
-    df_fa_out = pd.concat([df_fa, pd.DataFrame(additions)], ignore_index=True)
+    df_fa_out = pd.concat([df_fa, additions], ignore_index=True)
     df_r_out  = df_r[["EID_1", "AID_2", "relationshipType", "number"]]
     print(f"🔀 Split pass: {len(additions)} new AIDs minted due to conflicting signatures")
     return df_fa_out, df_r_out
@@ -132,51 +155,67 @@ def split_conflicting_addresses(
 def resolve_and_apply_changes(
     df_fa_in: pd.DataFrame,
     df_r_in: pd.DataFrame,
-    proposals: List[ProposedChange],
+    proposals: ProposalBatch,
     current_max_aid: int,
-    reconstructor: Callable[[pd.Series], str],
+    reconstructor: Callable[[pd.DataFrame], pd.Series],
 ) -> tuple[DataFrame, DataFrame, int | Any, list[SplitEvent]]:
     """Apply proposed fixes; split on conflict (vectorised)."""
     df_fa = df_fa_in.copy()
     df_r  = df_r_in.copy()
 
     splits: list[SplitEvent] = []      #  ← NEW
+    touched_idx: set[Any] = set()      # row labels whose fullAddress_c must be rebuilt
+
+    # cell writes (col → {row: value}), split rows and (AID, EID) → new AID
+    # remaps are all collected in the loop and applied once afterwards
+    updates: defaultdict[str, dict[int, Any]] = defaultdict(dict)
+    new_rows: list[dict] = []
+    aid_remap: dict[tuple[int, str], int] = {}
+
+    # Bucket proposals by (AID, column): stable sort on the factorized key
+    # keeps buckets in first-seen order and proposals in input order
+    if len(proposals):
+        codes, _ = pd.MultiIndex.from_arrays([proposals.aid, proposals.col]).factorize()
+        order    = np.argsort(codes, kind="stable")
+        buckets  = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1)
+    else:
+        buckets = []
+
+    # AID → first row label, built once instead of scanning df_fa per bucket.
+    # Split rows are only appended after the loop, so it never goes stale.
+    first   = ~df_fa["AID"].duplicated()
+    aid2row = dict(zip(df_fa.loc[first, "AID"].tolist(), df_fa.index[first].tolist()))
 
-    # Bucket proposals by (AID, column)
-    bucket: dict[tuple[int, str], list[ProposedChange]] = defaultdict(list)
-    for p in proposals:
-        bucket[(p["original_AID"], p["column_to_change"])].append(p)
+    for items in buckets:
+        aid, col = int(proposals.aid[items[0]]), proposals.col[items[0]]
 
-    for (aid, col), items in bucket.items():
         # Map proposed_value to list[EID]
         val2eids: defaultdict = defaultdict(list)
-        for p in items:
-            if p["EID_context"] not in val2eids[p["proposed_value"]]:
-                val2eids[p["proposed_value"]].append(p["EID_context"])
+        for val, eid in zip(proposals.new[items], proposals.eid[items]):
+            if eid not in val2eids[val]:
+                val2eids[val].append(eid)
 
         # Fetch current value quickly
-        idx = df_fa.index[df_fa["AID"] == aid]
-        if idx.empty:
+        row = aid2row.get(aid)
+        if row is None:
             continue  # stale AID from earlier split
-        cur_val = df_fa.at[idx[0], col]
+        cur_val = df_fa.at[row, col]
 
         #NO CONFLICT
         if len(val2eids) == 1:
             new_val = next(iter(val2eids))
             if (pd.isna(cur_val) and pd.isna(new_val)) or (cur_val == new_val):
                 continue  # nothing to do
-            df_fa.at[idx[0], col] = new_val
-            if "fullAddress_c" in df_fa.columns:
-                df_fa.at[idx[0], "fullAddress_c"] = reconstructor(df_fa.loc[idx[0]])
+            updates[col][row] = new_val
+            touched_idx.add(row)
             continue
 
         # IF CONFLICT, pick majority, split others
         # Sort by supporter count desc, then value for determinism
         majority_val = max(val2eids.items(), key=lambda x: (len(x[1]), str(x[0])))[0]
         if cur_val != majority_val:
-            df_fa.at[idx[0], col] = majority_val
-            if "fullAddress_c" in df_fa.columns:
-                df_fa.at[idx[0], "fullAddress_c"] = reconstructor(df_fa.loc[idx[0]])
+            updates[col][row] = majority_val
+            touched_idx.add(row)
 
         # Handle minority variants
         for variant_val, supporters in val2eids.items():
@@ -192,16 +231,40 @@ def resolve_and_apply_changes(
                            new_value=str(variant_val))
             )
 
-            new_row = df_fa.loc[idx[0]].copy()
+            # clone the row as it stands now, i.e. with its pending writes
+            new_row = df_fa.loc[row].to_dict()
+            for c, vals in updates.items():
+                if row in vals:
+                    new_row[c] = vals[row]
             new_row["AID"] = new_aid
             new_row[col] = variant_val
-            if "fullAddress_c" in df_fa.columns:
-                new_row["fullAddress_c"] = reconstructor(new_row)
-            df_fa = pd.concat([df_fa, pd.DataFrame([new_row])], ignore_index=True)
-
-            supporter_set = set([s for s in supporters if s is not None])
-            mask = (df_r["AID_2"] == aid) & (df_r["EID_1"].isin(supporter_set))
-            df_r.loc[mask, "AID_2"] = new_aid
+            new_rows.append(new_row)
+
+            # first split wins, as rows already moved no longer match `aid`
+            for s in supporters:
+                if s is not None:
+                    aid_remap.setdefault((aid, s), new_aid)
+
+    for c, vals in updates.items():
+        df_fa.loc[list(vals), c] = list(vals.values())
+
+    # Rebuild fullAddress_c once for every touched row instead of per proposal;
+    # done before the concat below, which renumbers the index
+    if touched_idx and "fullAddress_c" in df_fa.columns:
+        rows = sorted(touched_idx)
+        df_fa.loc[rows, "fullAddress_c"] = reconstructor(df_fa.loc[rows])
+
+    if new_rows:
+        added = pd.DataFrame(new_rows)
+        if "fullAddress_c" in added.columns:
+            added["fullAddress_c"] = reconstructor(added)
+        df_fa = pd.concat([df_fa, added], ignore_index=True)
+
+    if aid_remap:
+        keys   = pd.MultiIndex.from_arrays([df_r["AID_2"], df_r["EID_1"]])
+        mapped = pd.Series(keys.map(aid_remap), index=df_r.index)
+        hit    = mapped.notna()
+        df_r.loc[hit, "AID_2"] = mapped[hit].astype(int)
 
     return df_fa, df_r, current_max_aid, splits
 
@@ -213,11 +276,33 @@ def create_merged_view(df_fa: pd.DataFrame, df_r: pd.DataFrame, df_fe: pd.DataFr
             .merge(df_fa, left_on="AID_2", right_on="AID", how="left")
     )
 
-def _show_samples(rule_name: str, props: list[ProposedChange], k: int = 5) -> None:
+def create_rule_view(merged: pd.DataFrame) -> pd.DataFrame:
+    """Lean projection of the merged view shared by all rules, norm keys included."""
+    lean = merged.loc[:, [c for c in RULE_COLUMNS if c in merged.columns]].copy()
+    # street/city/state norms once here instead of once per rule
+    return add_norm_columns(lean)
+
+def run_rules(lean: pd.DataFrame) -> dict[str, Any]:
+    """Run the independent rule engines, in parallel processes when cores allow."""
+    jobs: dict[str, tuple[Callable, dict]] = {
+        "zip":    (propose_zip_rules, {}),                                            # Rule 1, 3a, 3b
+        "street": (propose_street_name_corrections, {"threshold": STREET_THRESHOLD}),  # Rule 2
+        "city":   (propose_correct_city_names_by_zip, {"threshold": CITY_THRESHOLD}),  # Rule 4
+    }
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        return {name: fn(lean, **kw) for name, (fn, kw) in jobs.items()}
+
+    # the lean view is small enough that pickling it to each worker is cheap
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futs = {name: ex.submit(fn, lean, **kw) for name, (fn, kw) in jobs.items()}
+        return {name: f.result() for name, f in futs.items()}
+
+def _show_samples(rule_name: str, props: ProposalBatch, k: int = 5) -> None:
     print(f"    {rule_name}: {len(props):,} proposals generated")
-    if not props:
+    if not len(props):
         return
-    for p in props[:k]:
+    for p in props.records(k):
         short = {k: p[k] for k in ("original_AID", "column_to_change",
                                    "original_value", "proposed_value")}
         print(f"       • {short}")
@@ -231,33 +316,29 @@ def main() -> None:
 
     print("\nBuilding merged view …")
     merged = create_merged_view(df_fa, df_r, df_fe)
+    lean   = create_rule_view(merged)
 
-    proposals: list[ProposedChange] = []
+    results = run_rules(lean)
+    r1, r3a, r3b = results["zip"]
+    r2 = results["street"]
+    r4 = results["city"]
 
     # Rule 1
-    r1 = propose_fill_missing_zips_keep(merged)
     _show_samples("Rule 1  (fill missing ZIPs – keep)", r1)
-    proposals += r1
 
     #Rule 2
-    r2 = propose_street_name_corrections(merged, threshold=STREET_THRESHOLD)
     _show_samples("Rule 2  (fuzzy search street-name)", r2)
-    proposals += r2
 
     #Rule 3a
-    r3a = propose_replace_invalid_zips(merged)
     _show_samples("Rule 3a (replace invalid ZIPs)", r3a)
-    proposals += r3a
 
     #Rule 3b
-    r3b = propose_fill_missing_zips_by_address(merged)
     _show_samples("Rule 3b (fill missing ZIPs by addr)", r3b)
-    proposals += r3b
 
     #Rule 4
-    r4 = propose_correct_city_names_by_zip(merged, threshold=CITY_THRESHOLD)
     _show_samples("Rule 4  (fuzzy city by ZIP)", r4)
-    proposals += r4
+
+    proposals = ProposalBatch.concat([r1, r2, r3a, r3b, r4])
 
     print(f"\n Collected {len(proposals):,} total proposals → resolving …")
     df_fa, df_r, max_aid, split_log = resolve_and_apply_changes(